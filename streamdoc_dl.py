@@ -2,19 +2,27 @@
 """Download PDFs from StreamDocs viewers (e.g. standard.go.kr)."""
 
 import argparse
-import json
+import functools
+import hashlib
+import heapq
 import os
+import queue
 import shutil
+import struct
 import subprocess
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from pathlib import Path
 
+import orjson
 import requests
+from PIL import Image
 from reportlab.lib.utils import ImageReader
-from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase import pdfdoc, pdfmetrics, pdfutils
 from reportlab.pdfgen import canvas
+from urllib3.util import Retry
 
 
 def parse_streamdocs_url(url: str) -> tuple[str, str]:
@@ -35,20 +43,21 @@ def get_document_info(session: requests.Session, base_url: str, doc_id: str) ->
     heads = resp.headers.get("sd-body-heads", "").split(",")
     sizes = [int(s) for s in resp.headers.get("sd-body-sizes", "").split(",")]
 
-    data = resp.content
+    # Slicing a memoryview doesn't copy; orjson parses the views directly
+    data = memoryview(resp.content)
     offset = 0
     result = {}
     for name, size in zip(heads, sizes, strict=True):
         chunk = data[offset : offset + size]
         offset += size
         if name == "document":
-            doc = json.loads(chunk)
+            doc = orjson.loads(chunk)
             result["layouts"] = doc.get("layout", [])
             result["page_count"] = len(result["layouts"])
             result["info"] = doc.get("info", {})
             result["filename"] = result["info"].get("FileName", "")
         elif name == "authorize":
-            auth = json.loads(chunk)
+            auth = orjson.loads(chunk)
             result["download"] = auth.get("download", False)
 
     if "page_count" not in result:
@@ -67,14 +76,28 @@ def try_direct_download(
     return None
 
 
+# Real first byte of each image type, for the content types the server sends
+_FIRST_BYTE = {
+    "image/png": b"\x89",
+    "image/jpeg": b"\xff",
+    "image/jpg": b"\xff",
+    "image/jp2": b"\xff",
+}
+
+
 def fix_image_bytes(data: bytes, content_type: str) -> bytes:
     """Fix the first byte that the server corrupts as anti-scrape."""
-    buf = bytearray(data)
-    if "png" in content_type:
-        buf[0] = 0x89
-    elif "jp" in content_type:
-        buf[0] = 0xFF
-    return bytes(buf)
+    first = _FIRST_BYTE.get(content_type)
+    if first is None:
+        # Anything unexpected (parameters, odd spellings): match loosely
+        if "png" in content_type:
+            first = b"\x89"
+        elif "jp" in content_type:
+            first = b"\xff"
+        else:
+            return data
+    # Concatenating onto a memoryview copies the payload once
+    return first + memoryview(data)[1:]
 
 
 def download_page_image(
@@ -102,14 +125,17 @@ def download_page_text(
     base_url: str,
     doc_id: str,
     page_index: int,
-) -> tuple[int, list]:
-    """Download text blocks for a page. Returns (index, text_blocks)."""
+) -> tuple[int, bytes]:
+    """Download text blocks for a page. Returns (index, raw JSON bytes)."""
     url = f"{base_url}/v4/documents/{doc_id}/texts/{page_index}"
     resp = session.get(url)
     resp.raise_for_status()
-    return page_index, resp.json()
+    # Parse once to reject a bad body here, before it gets into the cache
+    orjson.loads(resp.content)
+    return page_index, resp.content
 
 
+@functools.lru_cache(maxsize=8)
 def find_font(font_path: str | None) -> str | None:
     """Find a Korean TTF font. Returns path or None to use CID fallback."""
     if font_path:
@@ -148,12 +174,21 @@ def find_font(font_path: str | None) -> str | None:
 def register_font(font_path: str | None) -> str:
     """Register a font and return its name for use in the canvas."""
     path = find_font(font_path)
+    registered = pdfmetrics.getRegisteredFontNames()
     if path:
+        # Parsing the TTF is the expensive part, and reportlab ignores a
+        # second TTFont under a name that is already taken anyway
+        if "TextFont" in registered:
+            return "TextFont"
+
         from reportlab.pdfbase.ttfonts import TTFont
 
         pdfmetrics.registerFont(TTFont("TextFont", path))
         return "TextFont"
 
+    if "HYSMyeongJo-Medium" in registered:
+        return "HYSMyeongJo-Medium"
+
     # Fallback: CID font (built into reportlab, no file needed)
     print("Warning: No Korean TTF font found, using built-in CID font fallback")
     print("For best results, install a Korean font or specify --font /path/to/font.ttf")
@@ -163,16 +198,197 @@ def register_font(font_path: str | None) -> str:
     return "HYSMyeongJo-Medium"
 
 
+def load_raw_jpeg(img, data: bytes) -> bool:
+    """Like PDFImageXObject.loadImageFromJPEG, minus the ASCII85 encoding."""
+    try:
+        width, height, components, _ = pdfutils.readJPEGInfo(BytesIO(data))
+    except (pdfdoc.PDFError, struct.error):
+        return False
+    img.width, img.height = width, height
+    img.bitsPerComponent = 8
+    if components == 1:
+        img.colorSpace = "DeviceGray"
+    elif components == 3:
+        img.colorSpace = "DeviceRGB"
+    else:
+        img.colorSpace = "DeviceCMYK"
+        img._dotrans = 1
+    img.streamContent = data
+    img._filters = ("DCTDecode",)
+    img.mask = None
+    return True
+
+
+def embed_raw_image(c, data: bytes, x, y, width, height, max_dpi=None):
+    """Draw a page image, embedding JPEG data as-is instead of re-encoding it.
+
+    XObjects are keyed on a hash of the source image bytes, so pages sharing
+    the same background image all reference a single embedded copy, and with
+    max_dpi it is only downscaled the first time it is seen.
+    """
+    # Same bookkeeping as Canvas.drawImage, minus decoding the image just
+    # to compute its name.
+    name = hashlib.sha1(data).hexdigest()
+    if max_dpi:
+        name = f"{name}-{max_dpi}-{width:g}"
+    reg_name = c._doc.getXObjectName(name)
+    if reg_name not in c._doc.idToObject:
+        if max_dpi:
+            data = downscale_image(data, width, max_dpi)
+        img = pdfdoc.PDFImageXObject(name)
+        if data[:2] != b"\xff\xd8" or not load_raw_jpeg(img, data):
+            # PNG (or anything else) is decoded by Pillow, once per image
+            img.loadImageFromSRC(ImageReader(BytesIO(data)))
+        c._setXObjects(img)
+        c._doc.Reference(img, reg_name)
+        c._doc.addForm(name, img)
+
+    c._currentPageHasImages = 1
+    c.saveState()
+    c.translate(x, y)
+    c.scale(width, height)
+    c._code.append(f"/{reg_name} Do")
+    c.restoreState()
+    c._formsinuse.append(name)
+
+
+def downscale_image(data: bytes, page_width, max_dpi: int) -> bytes:
+    """Shrink an image wider than max_dpi at page_width points, as JPEG."""
+    img = Image.open(BytesIO(data))
+    target_w = int(page_width * max_dpi / 72)
+    if img.width <= target_w:
+        return data
+
+    target_h = max(round(img.height * target_w / img.width), 1)
+    img = img.resize((target_w, target_h), Image.Resampling.LANCZOS)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buf = BytesIO()
+    img.save(buf, "JPEG", quality=85, optimize=True)
+    return buf.getvalue()
+
+
+def glyph_runs(glyphs, font_name):
+    """Group positioned glyphs into runs that can be drawn as one string.
+
+    glyphs is a list of (ch, left, bottom, size). A run shares a baseline
+    and size, and its glyphs sit where the font's advance widths plus one
+    constant character spacing put them. Yields (left, bottom, size, text,
+    char_space); char_space is None for a lone glyph.
+    """
+    string_width = pdfmetrics.stringWidth
+    chars = []
+    start = run_bottom = run_size = prev_left = space = None
+    advance = 0.0
+    for ch, left, bottom, size in glyphs:
+        if chars and bottom == run_bottom and size == run_size and left > prev_left:
+            k = len(chars)
+            if k == 1:
+                # The second glyph fixes the spacing for the rest of the run
+                space = left - start - advance
+                fits = True
+            else:
+                fits = abs(start + advance + k * space - left) <= size * 0.1
+            if fits:
+                chars.append(ch)
+                advance += string_width(ch, font_name, size)
+                prev_left = left
+                continue
+
+        if chars:
+            yield start, run_bottom, run_size, "".join(chars), space
+        chars = [ch]
+        start = prev_left = left
+        run_bottom, run_size = bottom, size
+        advance = string_width(ch, font_name, size)
+        space = None
+
+    if chars:
+        yield start, run_bottom, run_size, "".join(chars), space
+
+
+def render_page(
+    c, layout, image, text_blocks, font_name, strip_watermark=True, max_dpi=None
+):
+    """Draw one page (image background + invisible text) and finish it."""
+    w = layout["bbox"]["w"]
+    h = layout["bbox"]["h"]
+    c.setPageSize((w, h))
+
+    if image:
+        embed_raw_image(c, image, 0, 0, w, h, max_dpi)
+
+    # Scan-only pages often come back as a list of empty blocks; skip them
+    # so they don't get an alpha ExtGState they never use.
+    if text_blocks and any(b.get("text") and b.get("rect") for b in text_blocks):
+        # Detect watermark: rotated blocks + bimodal height distribution
+        wm_threshold = None
+        if strip_watermark:
+            heights = []
+            has_rotated = False
+            for block in text_blocks:
+                if block.get("rotate", 0) != 0:
+                    has_rotated = True
+                for rect in block.get("rect", []):
+                    heights.append(rect["top"] - rect["bottom"])
+            if has_rotated and heights:
+                sorted_h = sorted(heights)
+                median_h = sorted_h[len(sorted_h) // 2]
+                max_h = sorted_h[-1]
+                if max_h >= median_h * 3:
+                    wm_threshold = median_h * 2
+
+        c.setFillAlpha(0)
+        # One text object for the whole page, switching font size only when
+        # it changes (usually a handful of times per page, even across
+        # blocks), instead of a BT/Tf/ET triple per glyph.
+        t = c.beginText()
+        set_font = t.setFont
+        set_origin = t.setTextOrigin
+        text_out = t.textOut
+        last_size = None
+        last_space = 0
+        for block in text_blocks:
+            text_str = block.get("text", "")
+            rects = block.get("rect", [])
+            if not text_str or not rects:
+                continue
+
+            glyphs = []
+            for ch, rect in zip(text_str, rects, strict=True):
+                bottom = rect["bottom"]
+                font_size = max(rect["top"] - bottom, 1)
+                if wm_threshold and font_size > wm_threshold:
+                    continue
+                glyphs.append((ch, rect["left"], bottom, round(font_size, 1)))
+
+            for left, bottom, size, text, char_space in glyph_runs(glyphs, font_name):
+                if size != last_size:
+                    set_font(font_name, size)
+                    last_size = size
+                if char_space is not None and char_space != last_space:
+                    t.setCharSpace(char_space)
+                    last_space = char_space
+                set_origin(left, bottom)
+                text_out(text)
+        c.drawText(t)
+
+    c.showPage()
+
+
 def build_pdf(
-    layouts,
-    images,
-    texts,
+    pages,
     output_path,
     doc_info=None,
     font_name="Helvetica",
     strip_watermark=True,
+    max_dpi=None,
 ):
-    """Build a PDF with image backgrounds and invisible text overlay."""
+    """Build a PDF with image backgrounds and invisible text overlay.
+
+    pages yields (layout, image_bytes, text_json) in page order; each page
+    is drawn as soon as it is produced, so it may block on downloads.
+    """
     c = canvas.Canvas(str(output_path))
 
     if doc_info:
@@ -183,72 +399,57 @@ def build_pdf(
         c.setCreator(doc_info.get("Creator", ""))
         c.setProducer(doc_info.get("Producer", ""))
 
-    for i, layout in enumerate(layouts):
-        w = layout["bbox"]["w"]
-        h = layout["bbox"]["h"]
-        c.setPageSize((w, h))
-
-        if images[i]:
-            img = ImageReader(BytesIO(images[i]))
-            c.drawImage(img, 0, 0, width=w, height=h)
-
-        if texts[i]:
-            # Detect watermark: rotated blocks + bimodal height distribution
-            wm_threshold = None
-            if strip_watermark:
-                heights = []
-                has_rotated = False
-                for block in texts[i]:
-                    if block.get("rotate", 0) != 0:
-                        has_rotated = True
-                    for rect in block.get("rect", []):
-                        heights.append(rect["top"] - rect["bottom"])
-                if has_rotated and heights:
-                    sorted_h = sorted(heights)
-                    median_h = sorted_h[len(sorted_h) // 2]
-                    max_h = sorted_h[-1]
-                    if max_h >= median_h * 3:
-                        wm_threshold = median_h * 2
-
-            c.setFillAlpha(0)
-            for block in texts[i]:
-                text_str = block.get("text", "")
-                rects = block.get("rect", [])
-                if not text_str or not rects:
-                    continue
-
-                for ch, rect in zip(text_str, rects, strict=True):
-                    font_size = max(rect["top"] - rect["bottom"], 1)
-                    if wm_threshold and font_size > wm_threshold:
-                        continue
-                    c.setFont(font_name, font_size)
-                    c.drawString(rect["left"], rect["bottom"], ch)
-
-        c.showPage()
+    # Pages share one canvas on purpose: the TrueType subsets and the
+    # hash-keyed image XObjects are then embedded once per document
+    # rather than once per page.
+    for layout, image, text in pages:
+        # Text stays as the raw response JSON until the page is drawn
+        text_blocks = orjson.loads(text) if text else None
+        render_page(c, layout, image, text_blocks, font_name, strip_watermark, max_dpi)
 
     c.save()
 
 
 def compress_pdf(path: str, level: str = "ebook"):
-    """Compress PDF using Ghostscript."""
-    gs = shutil.which("gs")
-    if not gs:
-        print("Warning: Ghostscript (gs) not found, skipping compression")
-        return
-
+    """Compress PDF losslessly with pikepdf ("lossless") or with Ghostscript."""
     tmp = path + ".tmp"
-    cmd = [
-        gs,
-        "-sDEVICE=pdfwrite",
-        "-dCompatibilityLevel=1.4",
-        f"-dPDFSETTINGS=/{level}",
-        "-dNOPAUSE",
-        "-dBATCH",
-        "-dQUIET",
-        f"-sOutputFile={tmp}",
-        path,
-    ]
-    subprocess.run(cmd, check=True)
+    if level == "lossless":
+        try:
+            import pikepdf
+        except ImportError:
+            print("Warning: pikepdf not installed, skipping compression")
+            print("Install it with: pip install 'streamdoc-dl[compress]'")
+            return
+
+        # In-process qpdf pass: unwraps and recompresses ReportLab's
+        # ASCII85+Flate streams (content, fonts, PNG pages) and packs objects
+        # into object streams. JPEG (DCT) streams are copied unchanged.
+        with pikepdf.open(path) as pdf:
+            pdf.save(
+                tmp,
+                compress_streams=True,
+                stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                linearize=True,
+            )
+    else:
+        gs = shutil.which("gs")
+        if not gs:
+            print("Warning: Ghostscript (gs) not found, skipping compression")
+            return
+
+        cmd = [
+            gs,
+            "-sDEVICE=pdfwrite",
+            "-dCompatibilityLevel=1.4",
+            f"-dPDFSETTINGS=/{level}",
+            "-dNOPAUSE",
+            "-dBATCH",
+            "-dQUIET",
+            f"-sOutputFile={tmp}",
+            path,
+        ]
+        subprocess.run(cmd, check=True)
 
     original = Path(path).stat().st_size
     compressed = Path(tmp).stat().st_size
@@ -260,6 +461,72 @@ def compress_pdf(path: str, level: str = "ebook"):
         print("Compression would increase size, skipped")
 
 
+# O_BINARY only exists (and matters) on Windows
+_CACHE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def write_cache_file(path: Path, data: bytes):
+    """Write a cache file with a bare open/write/close, then move it in place.
+
+    Resume treats any existing file as cached, so a write cut short must
+    never leave a truncated file under the final name.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, _CACHE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+
+class PageQueue:
+    """Hand out page indices in order as their image and text get cached."""
+
+    def __init__(self, page_count: int, missing: list[tuple[str, int]]):
+        self._pending = [0] * page_count
+        for _, i in missing:
+            self._pending[i] += 1
+        # Min-heap of pages whose parts are all cached (sorted, so a heap)
+        self._ready = [i for i, n in enumerate(self._pending) if not n]
+        self._cond = threading.Condition()
+        self._error = None
+
+    def done(self, page_index: int):
+        """Mark one part (image or text) of a page as cached."""
+        with self._cond:
+            self._pending[page_index] -= 1
+            if not self._pending[page_index]:
+                heapq.heappush(self._ready, page_index)
+                self._cond.notify()
+
+    def fail(self, error: BaseException):
+        """Abort iteration; the consumer re-raises error."""
+        with self._cond:
+            self._error = error
+            self._cond.notify()
+
+    def __iter__(self):
+        for i in range(len(self._pending)):
+            with self._cond:
+                while not self._ready or self._ready[0] != i:
+                    if self._error:
+                        raise self._error
+                    self._cond.wait()
+                heapq.heappop(self._ready)
+            yield i
+
+
+def positive_int(value: str) -> int:
+    """argparse type for options that must be a positive integer."""
+    n = int(value)
+    if n <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value}")
+    return n
+
+
 def main():
     parser = argparse.ArgumentParser(description="Download PDF from StreamDocs viewer")
     parser.add_argument("url", help="StreamDocs viewer URL")
@@ -281,7 +548,7 @@ def main():
         nargs="?",
         const="ebook",
         metavar="LEVEL",
-        help="Compress PDF with Ghostscript (levels: screen, ebook, printer, prepress; default: ebook)",
+        help="Compress PDF: lossless (pikepdf), or a Ghostscript level: screen, ebook, printer, prepress (default: ebook)",
     )
     parser.add_argument(
         "--tor",
@@ -293,6 +560,12 @@ def main():
         action="store_true",
         help="Keep watermark characters in the text layer",
     )
+    parser.add_argument(
+        "--max-dpi",
+        type=positive_int,
+        metavar="DPI",
+        help="Downscale page images above DPI before embedding (default: keep original)",
+    )
     args = parser.parse_args()
 
     base_url, doc_id = parse_streamdocs_url(args.url)
@@ -300,6 +573,19 @@ def main():
     print(f"Document ID: {doc_id}")
 
     session = requests.Session()
+    # One keep-alive connection per worker; retry flaky gateways
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=args.jobs,
+        pool_maxsize=args.jobs,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
     if args.tor:
         proxy = "socks5h://127.0.0.1:9050"
         session.proxies = {"http": proxy, "https": proxy}
@@ -336,22 +622,15 @@ def main():
     else:
         cache_home = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
     cache_dir = cache_home / "streamdoc-dl" / doc_id
-    images = [None] * page_count
-    texts = [None] * page_count
-    for i in range(page_count):
-        img_path = cache_dir / f"{i}.img"
-        txt_path = cache_dir / f"{i}.json"
-        if img_path.exists():
-            images[i] = img_path.read_bytes()
-        if txt_path.exists():
-            texts[i] = json.loads(txt_path.read_text())
-
-    # Download missing pages
+    images = [cache_dir / f"{i}.img" for i in range(page_count)]
+    texts = [cache_dir / f"{i}.json" for i in range(page_count)]
+
+    # Find pages missing from the cache
     missing = []
     for i in range(page_count):
-        if images[i] is None:
+        if not images[i].exists():
             missing.append(("img", i))
-        if texts[i] is None:
+        if not texts[i].exists():
             missing.append(("txt", i))
 
     if missing:
@@ -359,36 +638,6 @@ def main():
         if cached:
             print(f"Resuming: {cached}/{page_count * 2} cached")
         cache_dir.mkdir(parents=True, exist_ok=True)
-        done = 0
-        total = len(missing)
-
-        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
-            futures = {}
-            for kind, i in missing:
-                if kind == "img":
-                    futures[
-                        pool.submit(
-                            download_page_image, session, base_url, doc_id, i, args.zoom
-                        )
-                    ] = ("img", i)
-                else:
-                    futures[
-                        pool.submit(download_page_text, session, base_url, doc_id, i)
-                    ] = ("txt", i)
-
-            for future in as_completed(futures):
-                kind, _ = futures[future]
-                idx, data = future.result()
-                if kind == "img":
-                    images[idx] = data
-                    (cache_dir / f"{idx}.img").write_bytes(data)
-                else:
-                    texts[idx] = data
-                    (cache_dir / f"{idx}.json").write_text(json.dumps(data))
-                done += 1
-                print(f"\rDownloading: {done}/{total}", end="", flush=True)
-
-        print(" done.")
     else:
         print("All pages cached.")
 
@@ -396,16 +645,101 @@ def main():
     if not output:
         output = filename if filename else f"{doc_id[:32]}.pdf"
 
+    page_queue = PageQueue(page_count, missing)
+    done = 0
+    total = len(missing)
+    # Keep at most two requests per worker queued in the executor instead
+    # of submitting every missing part up front.
+    slots = threading.Semaphore(args.jobs * 2)
+    stop = threading.Event()
+
+    # Download callbacks hand their data to one writer thread, so pool
+    # workers go straight back to the network instead of blocking on disk.
+    writes = queue.Queue()
+
+    def save(path, future):
+        try:
+            idx, data = future.result()
+        except Exception as e:
+            page_queue.fail(e)
+            slots.release()
+            return
+        writes.put((path, idx, data))
+
+    def write_cache():
+        nonlocal done
+        while (item := writes.get()) is not None:
+            path, idx, data = item
+            try:
+                write_cache_file(path, data)
+            except Exception as e:
+                page_queue.fail(e)
+                continue
+            finally:
+                # Released only once written, so slots also bound how much
+                # downloaded data waits in memory
+                slots.release()
+            page_queue.done(idx)
+            done += 1
+            print(f"\rDownloading: {done}/{total}", end="", flush=True)
+
+    def submit_missing(pool):
+        for kind, i in missing:
+            slots.acquire()
+            if stop.is_set():
+                return
+            try:
+                if kind == "img":
+                    future = pool.submit(
+                        download_page_image, session, base_url, doc_id, i, args.zoom
+                    )
+                    future.add_done_callback(functools.partial(save, images[i]))
+                else:
+                    future = pool.submit(
+                        download_page_text, session, base_url, doc_id, i
+                    )
+                    future.add_done_callback(functools.partial(save, texts[i]))
+            except RuntimeError:
+                return  # pool shut down after a failure
+
+    def pages():
+        for i in page_queue:
+            yield layouts[i], images[i].read_bytes(), texts[i].read_bytes()
+
     print("Building PDF...")
-    build_pdf(
-        layouts,
-        images,
-        texts,
-        output,
-        doc_info=info.get("info", {}),
-        font_name=font_name,
-        strip_watermark=not args.no_strip_watermark,
-    )
+    # Downloads run in the background while build_pdf consumes pages in
+    # index order as soon as both parts of the next page are cached.
+    writer = threading.Thread(target=write_cache, daemon=True)
+    writer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            producer = threading.Thread(
+                target=submit_missing, args=(pool,), daemon=True
+            )
+            producer.start()
+            try:
+                build_pdf(
+                    pages(),
+                    output,
+                    doc_info=info.get("info", {}),
+                    font_name=font_name,
+                    strip_watermark=not args.no_strip_watermark,
+                    max_dpi=args.max_dpi,
+                )
+            except BaseException:
+                stop.set()
+                slots.release()
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            producer.join()
+    finally:
+        # Also on failure: finish the writes already downloaded so the next
+        # run can resume from them
+        writes.put(None)
+        writer.join()
+
+    if missing:
+        print(" done.")
 
     if args.compress:
         print(f"Compressing ({args.compress})...")